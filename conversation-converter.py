@@ -9,37 +9,116 @@ Usage:
     python conversation-converter.py input.jsonl [output_dir]
 """
 
+import io
 import json
+import mmap
 import sys
 import os
 import re
+import stat
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterator, Optional
+
+# Use orjson for faster line decoding when it is installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# Filename cleanup patterns
+_RE_NONWORD = re.compile(r'[^\w-]')
+_RE_DASHES = re.compile(r'-+')
+
+# Use ciso8601 for faster timestamp parsing when it is installed
+try:
+    from ciso8601 import parse_datetime as parse_iso_datetime
+except ImportError:
+    if sys.version_info >= (3, 11):
+        # fromisoformat accepts the 'Z' suffix natively
+        parse_iso_datetime = datetime.fromisoformat
+    else:
+        def parse_iso_datetime(timestamp_str: str) -> datetime:
+            return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern a string field that repeats across messages so copies share one object."""
+    return sys.intern(value) if type(value) is str else value
+
+class ConversationMessage:
+    """A single user or assistant message from the conversation."""
+    __slots__ = ('type', 'uuid', 'parent_uuid', 'timestamp', 'is_sidechain', 'session_id',
+                 'working_dir', 'version', 'message', 'tool_use_result', 'request_id', 'model_change')
+    
+    def __init__(self, type: Optional[str], uuid: Optional[str], parent_uuid: Optional[str],
+                 timestamp: Optional[str], is_sidechain: bool, session_id: Optional[str],
+                 working_dir: Optional[str], version: Optional[str], message: Dict[str, Any],
+                 tool_use_result: Optional[Dict[str, Any]], request_id: Optional[str],
+                 model_change: Optional[tuple] = None):
+        self.type = type
+        self.uuid = uuid
+        self.parent_uuid = parent_uuid
+        self.timestamp = timestamp
+        self.is_sidechain = is_sidechain
+        self.session_id = session_id
+        self.working_dir = working_dir
+        self.version = version
+        self.message = message
+        self.tool_use_result = tool_use_result
+        self.request_id = request_id
+        self.model_change = model_change
 
 class ConversationConverter:
     def __init__(self):
         self.summaries = []
         self.messages = []
+        self._sidechain_by_parent = {}
         self.current_model = None
         self.session_id = None
         self.working_dir = None
         self.start_time = None
+        self._start_dt = None
+        self._first_user_text = None
         
     def parse_jsonl_file(self, file_path: str) -> None:
         """Parse JSONL file and extract conversation data."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                if not line.strip():
-                    continue
-                    
+        with open(file_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if stat.S_ISREG(st.st_mode):
+                # mmap cannot map an empty file
+                if st.st_size == 0:
+                    return
+                
                 try:
-                    data = json.loads(line)
-                    self._process_entry(data, line_num)
-                except json.JSONDecodeError as e:
-                    print(f"Warning: Invalid JSON on line {line_num}: {e}")
-                except Exception as e:
-                    print(f"Warning: Error processing line {line_num}: {e}")
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, OSError):
+                    mm = None
+                
+                if mm is not None:
+                    with mm:
+                        # Ask the kernel to read ahead aggressively (Python 3.8+, Unix only)
+                        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                            mm.madvise(mmap.MADV_SEQUENTIAL)
+                        
+                        self._parse_lines(iter(mm.readline, b''))
+                    return
+            
+            # Pipes and other non-mappable inputs are read line by line
+            self._parse_lines(f)
+    
+    def _parse_lines(self, lines: Iterator[bytes]) -> None:
+        """Decode and process raw JSONL lines."""
+        for line_num, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+                
+            try:
+                data = json_loads(line)
+                self._process_entry(data, line_num)
+            except json.JSONDecodeError as e:
+                print(f"Warning: Invalid JSON on line {line_num}: {e}")
+            except Exception as e:
+                print(f"Warning: Error processing line {line_num}: {e}")
     
     def _process_entry(self, data: Dict[str, Any], line_num: int) -> None:
         """Process a single JSONL entry."""
@@ -52,36 +131,53 @@ class ConversationConverter:
     
     def _process_message(self, data: Dict[str, Any]) -> None:
         """Process a user or assistant message."""
-        msg = {
-            'type': data.get('type'),
-            'uuid': data.get('uuid'),
-            'parent_uuid': data.get('parentUuid'),
-            'timestamp': data.get('timestamp'),
-            'is_sidechain': data.get('isSidechain', False),
-            'session_id': data.get('sessionId'),
-            'working_dir': data.get('cwd'),
-            'version': data.get('version'),
-            'message': data.get('message', {}),
-            'tool_use_result': data.get('toolUseResult'),
-            'request_id': data.get('requestId')
-        }
+        msg = ConversationMessage(
+            type=data.get('type'),
+            uuid=data.get('uuid'),
+            parent_uuid=data.get('parentUuid'),
+            timestamp=data.get('timestamp'),
+            is_sidechain=data.get('isSidechain', False),
+            session_id=_intern(data.get('sessionId')),
+            working_dir=_intern(data.get('cwd')),
+            version=_intern(data.get('version')),
+            message=data.get('message', {}),
+            tool_use_result=data.get('toolUseResult'),
+            request_id=data.get('requestId')
+        )
         
         # Track session metadata
         if not self.session_id:
-            self.session_id = msg['session_id']
+            self.session_id = msg.session_id
         if not self.working_dir:
-            self.working_dir = msg['working_dir']
-        if not self.start_time and msg['timestamp']:
-            self.start_time = msg['timestamp']
+            self.working_dir = msg.working_dir
+        if not self.start_time and msg.timestamp:
+            self.start_time = msg.timestamp
+        if self._first_user_text is None and msg.type == 'user':
+            # Remember the opening user text as a filename fallback
+            text = self._extract_content(msg.message)['text']
+            if text:
+                self._first_user_text = ' '.join(text)[:100]
             
         # Track model changes
-        if msg['type'] == 'assistant' and 'model' in msg['message']:
-            model = msg['message']['model']
-            if model != self.current_model:
-                msg['model_change'] = (self.current_model, model)
-                self.current_model = model
+        if msg.type == 'assistant':
+            model = msg.message.get('model')
+            if model:
+                model = msg.message['model'] = _intern(model)
+                if model != self.current_model:
+                    msg.model_change = (self.current_model, model)
+                    self.current_model = model
         
         self.messages.append(msg)
+        
+        # Index agent messages by parent for Task lookups
+        if msg.is_sidechain:
+            self._sidechain_by_parent.setdefault(msg.parent_uuid, []).append(msg)
+    
+    def _parse_start_time(self) -> datetime:
+        """Parse the conversation start time once for the header and filename."""
+        if self._start_dt is None:
+            self._start_dt = parse_iso_datetime(self.start_time)
+        return self._start_dt
     
     def _format_timestamp(self, timestamp_str: str) -> str:
         """Format timestamp for display."""
@@ -89,8 +185,9 @@ class ConversationConverter:
             return ""
         
         try:
-            dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-            return dt.strftime("%I:%M:%S %p").lstrip('0')
+            dt = parse_iso_datetime(timestamp_str)
+            hour = dt.hour
+            return f"{hour % 12 or 12}:{dt.minute:02d}:{dt.second:02d} {'AM' if hour < 12 else 'PM'}"
         except:
             return timestamp_str
     
@@ -159,7 +256,18 @@ class ConversationConverter:
             elif 'query' in tool_input:
                 detail = f'"{tool_input["query"]}"'
             elif 'prompt' in tool_input:
-                detail = f'"{tool_input["prompt"][:100]}{"..." if len(tool_input["prompt"]) > 100 else ""}"'
+                prompt = tool_input['prompt']
+                detail = f'"{prompt[:100]}{"..." if len(prompt) > 100 else ""}"'
+            elif 'file_path' in tool_input:
+                # Avoid stringifying file contents passed to Edit/Write
+                detail = f"`{tool_input['file_path']}`"
+            elif 'pattern' in tool_input:
+                # Grep/Glob: show the pattern, plus the search path if given
+                detail = f'"{tool_input["pattern"]}"'
+                if tool_input.get('path'):
+                    detail += f" in `{tool_input['path']}`"
+            elif 'path' in tool_input:
+                detail = f"`{tool_input['path']}`"
             else:
                 detail = str(tool_input)[:100]
         else:
@@ -185,17 +293,17 @@ class ConversationConverter:
         
         return f"→ {str(content)[:200]}"
     
-    def _group_messages_by_turn(self) -> List[List[Dict[str, Any]]]:
+    def _group_messages_by_turn(self) -> List[List[ConversationMessage]]:
         """Group messages into conversation turns."""
         turns = []
         current_turn = []
         
         for msg in self.messages:
-            if msg['is_sidechain']:
+            if msg.is_sidechain:
                 # Handle sidechain (agent) messages separately
                 continue
                 
-            if msg['type'] == 'user' and current_turn:
+            if msg.type == 'user' and current_turn:
                 # Start new turn
                 turns.append(current_turn)
                 current_turn = [msg]
@@ -207,58 +315,70 @@ class ConversationConverter:
         
         return turns
     
-    def _find_agent_messages(self, parent_uuid: str) -> List[Dict[str, Any]]:
+    def _find_agent_messages(self, parent_uuid: str) -> List[ConversationMessage]:
         """Find agent messages for a given parent UUID."""
-        return [msg for msg in self.messages 
-                if msg['is_sidechain'] and msg['parent_uuid'] == parent_uuid]
+        return self._sidechain_by_parent.get(parent_uuid, [])
     
-    def _format_agent_session(self, agent_messages: List[Dict[str, Any]], indent: str = "│ ") -> str:
+    def _format_agent_session(self, agent_messages: List[ConversationMessage], indent: str = "│ ") -> str:
         """Format agent session messages."""
         if not agent_messages:
             return ""
         
-        result = []
-        result.append("```")
-        result.append("╭─ AGENT START ─────────────────────────────────────")
+        buf = io.StringIO()
+        w = buf.write
+        w("```\n")
+        w("╭─ AGENT START ─────────────────────────────────────\n")
         
         # Agent metadata
         first_msg = agent_messages[0]
-        if first_msg['timestamp']:
-            result.append(f"│ Time: {self._format_timestamp(first_msg['timestamp'])}")
-        if 'usage' in first_msg.get('message', {}):
-            tokens = self._format_tokens(first_msg['message']['usage'])
-            result.append(f"│ Tokens: {tokens}")
-        if first_msg['working_dir']:
-            result.append(f"│ Working Directory: {first_msg['working_dir']}")
-        if first_msg['session_id']:
-            result.append(f"│ Session ID: {first_msg['session_id']} (sidechain)")
-        
-        result.append("├─────────────────────────────────────────────────")
-        result.append("")
+        if first_msg.timestamp:
+            w(f"│ Time: {self._format_timestamp(first_msg.timestamp)}\n")
+        if 'usage' in first_msg.message:
+            tokens = self._format_tokens(first_msg.message['usage'])
+            w(f"│ Tokens: {tokens}\n")
+        if first_msg.working_dir:
+            w(f"│ Working Directory: {first_msg.working_dir}\n")
+        if first_msg.session_id:
+            w(f"│ Session ID: {first_msg.session_id} (sidechain)\n")
+        
+        w("├─────────────────────────────────────────────────\n")
+        w("\n")
         
         # Agent messages
         for msg in agent_messages:
-            content = self._extract_content(msg['message'])
+            content = self._extract_content(msg.message)
             
             if content['text']:
-                result.append(f"Agent: {' '.join(content['text'])}")
-                result.append("")
+                w("Agent: ")
+                w(' '.join(content['text']))
+                w("\n\n")
             
             if content['tool_use']:
-                result.append("Agent Tools:")
+                w("Agent Tools:\n")
                 for tool in content['tool_use']:
                     tool_line = self._format_tool_use(tool)
-                    result.append(f"- {tool_line}")
-                result.append("")
+                    w(f"- {tool_line}\n")
+                w("\n")
         
-        result.append("╰─ AGENT END ───────────────────────────────────────")
-        result.append("```")
+        w("╰─ AGENT END ───────────────────────────────────────\n")
+        w("```")
         
-        return "\n".join(result)
+        return buf.getvalue()
     
     def generate_markdown(self) -> str:
         """Generate the complete markdown conversation."""
-        lines = []
+        return ''.join(self._iter_markdown())
+    
+    def _iter_markdown(self) -> Iterator[str]:
+        """Yield the markdown conversation one turn at a time, header first."""
+        yield self._render_header()
+        for turn_num, turn in enumerate(self._group_messages_by_turn(), 1):
+            yield self._render_turn(turn_num, turn)
+    
+    def _render_header(self) -> str:
+        """Render the title and thread header."""
+        buf = io.StringIO()
+        w = buf.write
         
         # Header
         if self.summaries:
@@ -266,120 +386,121 @@ class ConversationConverter:
         else:
             main_summary = "Conversation"
         
-        lines.append(f"# {main_summary}")
-        lines.append("")
+        w(f"# {main_summary}\n")
+        w("\n")
         
         # Thread Header
-        lines.append("## Thread Header")
+        w("## Thread Header\n")
         if self.summaries:
             for i, summary in enumerate(self.summaries):
-                lines.append(f"**Summary {i+1}:** {summary}")
+                w(f"**Summary {i+1}:** {summary}\n")
         
         if self.start_time:
-            dt = datetime.fromisoformat(self.start_time.replace('Z', '+00:00'))
-            lines.append(f"**Date:** {dt.strftime('%B %d, %Y')}")
+            dt = self._parse_start_time()
+            w(f"**Date:** {dt.strftime('%B %d, %Y')}\n")
         
         if self.current_model:
-            lines.append(f"**Model:** {self.current_model}")
+            w(f"**Model:** {self.current_model}\n")
         
         if self.working_dir:
-            lines.append(f"**Working Directory:** {self.working_dir}")
+            w(f"**Working Directory:** {self.working_dir}\n")
         
         if self.session_id:
-            lines.append(f"**Session ID:** {self.session_id}")
-        
-        lines.append("")
-        lines.append("---")
-        lines.append("")
+            w(f"**Session ID:** {self.session_id}\n")
         
-        # Message turns
-        turns = self._group_messages_by_turn()
+        w("\n")
+        w("---\n")
         
-        for turn_num, turn in enumerate(turns, 1):
-            lines.append(f"## Message Turn {turn_num}")
-            
-            # Turn metadata from first message
-            first_msg = turn[0]
-            if first_msg['timestamp']:
-                lines.append(f"**Time:** {self._format_timestamp(first_msg['timestamp'])}")
+        return buf.getvalue()
+    
+    def _render_turn(self, turn_num: int, turn: List[ConversationMessage]) -> str:
+        """Render one message turn, including the blank line after the previous separator."""
+        buf = io.StringIO()
+        w = buf.write
+        w("\n")
+        w(f"## Message Turn {turn_num}\n")
+        
+        # Turn metadata from first message
+        first_msg = turn[0]
+        if first_msg.timestamp:
+            w(f"**Time:** {self._format_timestamp(first_msg.timestamp)}\n")
+        
+        # Find assistant message for token info
+        assistant_msg = next((msg for msg in turn if msg.type == 'assistant'), None)
+        if assistant_msg and 'usage' in assistant_msg.message:
+            tokens = self._format_tokens(assistant_msg.message['usage'])
+            w(f"**Tokens:** {tokens}\n")
+        
+        w("\n")
+        
+        # Process each message in turn
+        for msg in turn:
+            content = self._extract_content(msg.message)
             
-            # Find assistant message for token info
-            assistant_msg = next((msg for msg in turn if msg['type'] == 'assistant'), None)
-            if assistant_msg and 'usage' in assistant_msg.get('message', {}):
-                tokens = self._format_tokens(assistant_msg['message']['usage'])
-                lines.append(f"**Tokens:** {tokens}")
+            # Model changes
+            if msg.model_change:
+                old_model, new_model = msg.model_change
+                w(f"**Model changed:** {old_model} → {new_model}\n")
+                w("\n")
             
-            lines.append("")
+            # User messages
+            if msg.type == 'user':
+                if content['text']:
+                    w("**User:**\n")
+                    w(' '.join(content['text']))
+                    w("\n\n")
             
-            # Process each message in turn
-            for msg in turn:
-                content = self._extract_content(msg['message'])
-                
-                # Model changes
-                if msg.get('model_change'):
-                    old_model, new_model = msg['model_change']
-                    lines.append(f"**Model changed:** {old_model} → {new_model}")
-                    lines.append("")
+            # Assistant content
+            elif msg.type == 'assistant':
+                # Thinking blocks
+                if content['thinking']:
+                    w("**Thinking:**\n")
+                    for thinking in content['thinking']:
+                        w(thinking)
+                        w("\n")
+                    w("\n")
                 
-                # User messages
-                if msg['type'] == 'user':
-                    if content['text']:
-                        lines.append("**User:**")
-                        lines.append(' '.join(content['text']))
-                        lines.append("")
-                
-                # Assistant content
-                elif msg['type'] == 'assistant':
-                    # Thinking blocks
-                    if content['thinking']:
-                        lines.append("**Thinking:**")
-                        for thinking in content['thinking']:
-                            lines.append(thinking)
-                        lines.append("")
-                    
-                    # Tool usage
-                    if content['tool_use']:
-                        lines.append("**Tools:**")
-                        for tool in content['tool_use']:
-                            tool_line = self._format_tool_use(tool)
-                            
-                            # Check for agent tasks
-                            if tool.get('name') == 'Task':
-                                # Find agent messages
-                                agent_msgs = self._find_agent_messages(msg['uuid'])
-                                if agent_msgs:
-                                    lines.append(f"- {tool_line}")
-                                    lines.append("")
-                                    lines.append(self._format_agent_session(agent_msgs))
-                                    lines.append("")
-                                else:
-                                    lines.append(f"- {tool_line}")
+                # Tool usage
+                if content['tool_use']:
+                    w("**Tools:**\n")
+                    for tool in content['tool_use']:
+                        tool_line = self._format_tool_use(tool)
+                        
+                        # Check for agent tasks
+                        if tool.get('name') == 'Task':
+                            # Find agent messages
+                            agent_msgs = self._find_agent_messages(msg.uuid)
+                            if agent_msgs:
+                                w(f"- {tool_line}\n")
+                                w("\n")
+                                w(self._format_agent_session(agent_msgs))
+                                w("\n\n")
                             else:
-                                # Regular tool with result
-                                result_info = ""
-                                if msg['tool_use_result']:
-                                    result_info = self._format_tool_result({}, msg['tool_use_result'])
-                                lines.append(f"- {tool_line} {result_info}")
-                        lines.append("")
-                    
-                    # Assistant text response
-                    if content['text']:
-                        lines.append("**Assistant:**")
-                        lines.append(' '.join(content['text']))
-                        lines.append("")
-            
-            lines.append("---")
-            lines.append("")
+                                w(f"- {tool_line}\n")
+                        else:
+                            # Regular tool with result
+                            result_info = ""
+                            if msg.tool_use_result:
+                                result_info = self._format_tool_result({}, msg.tool_use_result)
+                            w(f"- {tool_line} {result_info}\n")
+                    w("\n")
+                
+                # Assistant text response
+                if content['text']:
+                    w("**Assistant:**\n")
+                    w(' '.join(content['text']))
+                    w("\n\n")
+        
+        w("---\n")
         
-        return "\n".join(lines)
+        return buf.getvalue()
     
     def _clean_filename(self, text: str, max_length: int = 50) -> str:
         """Clean text for use in filename."""
         # Remove or replace problematic characters
-        text = re.sub(r'[<>:"/\\|?*]', '', text)  # Remove invalid chars
-        text = re.sub(r'[^\w\s-]', '', text)  # Keep only alphanumeric, spaces, hyphens
-        text = re.sub(r'\s+', '-', text)  # Replace spaces with hyphens
-        text = re.sub(r'-+', '-', text)  # Collapse multiple hyphens
+        text = '-'.join(text.split())  # Replace spaces with hyphens
+        text = _RE_NONWORD.sub('', text)  # Keep only alphanumeric and hyphens
+        text = _RE_DASHES.sub('-', text)  # Collapse multiple hyphens
         text = text.strip('-')  # Remove leading/trailing hyphens
         
         # Truncate if too long
@@ -396,7 +517,7 @@ class ConversationConverter:
         
         try:
             # Parse timestamp
-            dt = datetime.fromisoformat(self.start_time.replace('Z', '+00:00'))
+            dt = self._parse_start_time()
             date_str = dt.strftime("%Y-%m-%d")
             time_str = dt.strftime("%H%M%S")
             
@@ -404,15 +525,9 @@ class ConversationConverter:
             summary = ""
             if self.summaries:
                 summary = self.summaries[0]
-            elif hasattr(self, 'messages') and self.messages:
-                # Try to extract from first user message
-                for msg in self.messages:
-                    if msg['type'] == 'user':
-                        content = self._extract_content(msg['message'])
-                        if content['text']:
-                            first_text = ' '.join(content['text'])[:100]
-                            summary = first_text
-                            break
+            elif self._first_user_text:
+                # Fall back to first user message
+                summary = self._first_user_text
             
             if not summary:
                 summary = "conversation"
@@ -440,21 +555,28 @@ class ConversationConverter:
         else:
             output_filename = self._generate_output_filename(input_path)
         
-        # Handle filename conflicts
-        output_path = os.path.join(output_dir, output_filename)
-        counter = 1
+        # Handle filename conflicts (O_EXCL fails if the file already exists)
         base_name, ext = os.path.splitext(output_filename)
-        while os.path.exists(output_path):
-            conflicted_filename = f"{base_name}-{counter:02d}{ext}"
-            output_path = os.path.join(output_dir, conflicted_filename)
-            counter += 1
-        
-        # Generate markdown
-        markdown_content = self.generate_markdown()
-        
-        # Write output
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+        counter = 0
+        while True:
+            if counter:
+                output_filename = f"{base_name}-{counter:02d}{ext}"
+            output_path = os.path.join(output_dir, output_filename)
+            try:
+                fd = os.open(output_path, flags, 0o666)
+                break
+            except FileExistsError:
+                counter += 1
+        
+        # Generate and write markdown a turn at a time
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.writelines(chunk.encode('utf-8') for chunk in self._iter_markdown())
+        except Exception:
+            # Don't leave a partially written file behind
+            os.remove(output_path)
+            raise
         
         return output_path
 